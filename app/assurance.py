@@ -1,12 +1,26 @@
+import asyncio
 import threading
-import time
+import heapq
+import queue
 import random
+import time
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 
-from .store import get_intent, update_status, append_audit, attach_policy, conn
-from .llm_translator import llm_translate_intent
+import numpy as np
+
+from .store import get_intent_sla_selectors, update_status, append_audit, attach_policy, get_conn
+from .llm_translator import llm_translate_intent, breaker
+from .circuit_breaker import OPEN
 from .executor import apply_policy
+from .schemas import model_to_dict
+
+try:
+    from numba import njit, prange, float64, boolean, void
+    NUMBA_MODULE = True
+except Exception:
+    njit = None
+    NUMBA_MODULE = False
 
 logger = logging.getLogger("ibn.assurance")
 logger.setLevel(logging.INFO)
@@ -14,120 +28,370 @@ handler = logging.StreamHandler()
 handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
 logger.addHandler(handler)
 
-telemetry_state: Dict[str, Dict[str, float]] = {}
-
 # configuration
-TELEMETRY_POLL_SECONDS = 5
+TELEMETRY_POLL_SECONDS = 5  # cadence for intents without a known priority
+TELEMETRY_CADENCE_SECONDS = {"high": 1.0, "medium": 5.0, "low": 30.0}
+TELEMETRY_COALESCE_SECONDS = 0.05  # intents due within this window share one kernel call
+ACTIVE_STATUSES = ("deployed", "assured")
+_SQL_LIST_ACTIVE = "SELECT intent_id FROM intents WHERE status IN (?, ?)"
 LLM_RETRY_ATTEMPTS = 2
-LLM_RETRY_BACKOFF = 1.5 
+LLM_RETRY_BACKOFF_BASE = 0.5
+LLM_RETRY_BACKOFF_CAP = 30.0
+
+# event loop owning the LLM batcher (the FastAPI loop); set by start_background_loop
+_llm_loop: Optional[asyncio.AbstractEventLoop] = None
+
+# "intent active/inactive" events from the API; thread-safe so they can be posted before the loop runs
+_ACTIVE, _INACTIVE = "active", "inactive"
+_events: "queue.SimpleQueue[tuple]" = queue.SimpleQueue()
+_assurance_loop: Optional[asyncio.AbstractEventLoop] = None
+_wakeup: Optional[asyncio.Event] = None
 
 def _list_intents_from_db():
-    """Return list of (intent_id, status). Use a fresh cursor for thread-safety."""
+    """Return ids of intents under assurance (status deployed/assured) using this thread's connection."""
     try:
-        cur = conn.cursor()
-        cur.execute("SELECT intent_id, status FROM intents")
-        rows = cur.fetchall()
-        cur.close()
-        return rows
+        cur = get_conn().execute(_SQL_LIST_ACTIVE, ACTIVE_STATUSES)
+        # drained before the loop body runs: it writes on this same connection, and SQLite
+        # leaves rows changed by the connection mid-scan undefined for an open statement
+        return [intent_id for (intent_id,) in cur]
     except Exception as e:
         logger.exception("Failed to list intents from DB: %s", e)
         return []
 
-def _simulate_metrics_for_intent(intent_id: str) -> Dict[str, float]:
-    latency = random.uniform(20, 120)          
-    availability = random.uniform(98.0, 100.0) 
-    bandwidth = random.uniform(50, 400)       
-    return {"latency": latency, "availability": availability, "bandwidth": bandwidth}
+def _tick_kernel_numpy(sla_lat, sla_avail, sla_bw, out_lat, out_avail, out_bw, breach):
+    """Simulate one telemetry sample per intent into out_* and flag SLA breaches, over SoA arrays."""
+    n = sla_lat.shape[0]
+    out_lat[:] = np.random.uniform(20.0, 120.0, n)
+    out_avail[:] = np.random.uniform(98.0, 100.0, n)
+    out_bw[:] = np.random.uniform(50.0, 400.0, n)
+    breach[:] = (out_lat > sla_lat) | (out_avail < sla_avail) | (out_bw < sla_bw)
+
+if NUMBA_MODULE:
+    # eager signature: compiled (or loaded from cache) at import, not on the first tick
+    @njit(void(float64[:], float64[:], float64[:], float64[:], float64[:], float64[:], boolean[:]), parallel=True, cache=True)
+    def _tick_kernel(sla_lat, sla_avail, sla_bw, out_lat, out_avail, out_bw, breach):
+        for i in prange(sla_lat.shape[0]):
+            out_lat[i] = np.random.uniform(20.0, 120.0)
+            out_avail[i] = np.random.uniform(98.0, 100.0)
+            out_bw[i] = np.random.uniform(50.0, 400.0)
+            breach[i] = out_lat[i] > sla_lat[i] or out_avail[i] < sla_avail[i] or out_bw[i] < sla_bw[i]
+else:
+    _tick_kernel = _tick_kernel_numpy
 
-def _should_remediate(sla: Dict[str, Any], metrics: Dict[str, float]) -> bool:
+def _sla_row(sla: Dict[str, Any]):
+    # a missing threshold never triggers remediation
     return (
-        metrics["latency"] > sla.get("latency_ms", float("inf"))
-        or metrics["availability"] < sla.get("availability_pct", 0.0)
-        or metrics["bandwidth"] < sla.get("min_bandwidth_mbps", 0)
+        float(sla.get("latency_ms", np.inf)),
+        float(sla.get("availability_pct", 0.0)),
+        float(sla.get("min_bandwidth_mbps", 0)),
     )
 
-def _call_llm_with_retries(payload: Dict[str, Any], context: Optional[list] = None):
+class IntentTable:
+    """
+    SLA thresholds and last simulated metrics of the intents under assurance, stored as parallel
+    (SoA) float64 arrays. Row i belongs to ids[i]; idx maps intent_id -> row. Rows [0, len) are live.
+    Writers (the assurance loop) and readers (GET /telemetry) synchronise on `lock`.
+    """
+
+    _COLUMNS = ("sla_lat", "sla_avail", "sla_bw", "m_lat", "m_avail", "m_bw")
+
+    def __init__(self, capacity: int = 64):
+        self.lock = threading.Lock()
+        self.ids: List[str] = []
+        self.idx: Dict[str, int] = {}
+        for name in self._COLUMNS:
+            setattr(self, name, np.full(capacity, np.nan))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, intent_id: str) -> bool:
+        return intent_id in self.idx
+
+    def _grow(self):
+        capacity = 2 * self.sla_lat.shape[0]
+        for name in self._COLUMNS:
+            old = getattr(self, name)
+            new = np.full(capacity, np.nan)
+            new[:old.shape[0]] = old
+            setattr(self, name, new)
+
+    def add(self, intent_id: str, sla: Dict[str, Any]):
+        lat, avail, bw = _sla_row(sla)
+        with self.lock:
+            i = self.idx.get(intent_id)
+            if i is None:
+                i = len(self.ids)
+                if i == self.sla_lat.shape[0]:
+                    self._grow()
+                self.ids.append(intent_id)
+                self.idx[intent_id] = i
+                self.m_lat[i] = self.m_avail[i] = self.m_bw[i] = np.nan
+            self.sla_lat[i] = lat
+            self.sla_avail[i] = avail
+            self.sla_bw[i] = bw
+
+    def remove(self, intent_id: str):
+        with self.lock:
+            i = self.idx.pop(intent_id, None)
+            if i is None:
+                return
+            # move the last row into the hole so live rows stay contiguous
+            last = len(self.ids) - 1
+            if i != last:
+                moved = self.ids[last]
+                self.ids[i] = moved
+                self.idx[moved] = i
+                for name in self._COLUMNS:
+                    col = getattr(self, name)
+                    col[i] = col[last]
+            self.ids.pop()
+
+    def metrics(self, intent_id: str) -> Dict[str, float]:
+        with self.lock:
+            i = self.idx.get(intent_id)
+            if i is None or np.isnan(self.m_lat[i]):
+                return {}
+            return {"latency": float(self.m_lat[i]), "availability": float(self.m_avail[i]), "bandwidth": float(self.m_bw[i])}
+
+intent_table = IntentTable()
+
+async def _run_llm(payload: Dict[str, Any], context: Optional[list] = None):
+    coro = llm_translate_intent(payload, context=context)
+    if _llm_loop is None:
+        return await coro
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, _llm_loop))
+
+async def _call_llm_with_retries(payload: Dict[str, Any], context: Optional[list] = None):
+    if breaker.state == OPEN:
+        # fails fast into the deterministic fallback; retrying would only wait out the backoff
+        return await _run_llm(payload, context=context)
     attempt = 0
-    backoff = 1.0
     while attempt <= LLM_RETRY_ATTEMPTS:
         try:
-            return llm_translate_intent(payload, context=context)
+            return await _run_llm(payload, context=context)
         except Exception as e:
             attempt += 1
             logger.warning("LLM translate failed (attempt %d/%d): %s", attempt, LLM_RETRY_ATTEMPTS + 1, e)
             if attempt > LLM_RETRY_ATTEMPTS:
                 logger.error("LLM translate: out of retries")
                 raise
-            time.sleep(backoff)
-            backoff *= LLM_RETRY_BACKOFF
+            # exponential backoff with full jitter so concurrent remediations don't retry in lockstep
+            await asyncio.sleep(random.uniform(0, min(LLM_RETRY_BACKOFF_CAP, LLM_RETRY_BACKOFF_BASE * (2 ** attempt))))
 
-def telemetry_loop():
-    logger.info("Assurance telemetry loop starting (poll interval %s seconds)", TELEMETRY_POLL_SECONDS)
+async def _remediate_one(intent_id: str, selectors: Dict[str, Any], sla: Dict[str, Any], metrics: Dict[str, float]):
+    payload = {
+        "intent_id": intent_id,
+        "selectors": selectors,
+        "sla": sla,
+        "last_metrics": metrics
+    }
+
+    try:
+        new_policy = await _call_llm_with_retries(payload, context=None)
+    except Exception as e:
+        append_audit(intent_id, f"Remediation failed: LLM unavailable or error: {e}")
+        logger.exception("LLM remediation failed for %s", intent_id)
+        return
+
+    new_policy_dict = model_to_dict(new_policy)
+    try:
+        attach_policy(intent_id, new_policy_dict)
+        append_audit(intent_id, "LLM produced remediation policy and attached")
+        logger.info("[%s] LLM remediation produced policy", intent_id)
+    except Exception as e:
+        append_audit(intent_id, f"Remediation failed: cannot attach policy: {e}")
+        logger.exception("Failed to attach policy for %s", intent_id)
+        return
+
+    try:
+        res = await apply_policy(new_policy_dict)
+        if res.get("applied"):
+            update_status(intent_id, "deployed")
+            append_audit(intent_id, "Remediation applied successfully")
+            logger.info("[%s] Remediation applied successfully", intent_id)
+        else:
+            append_audit(intent_id, "Remediation application failed")
+            logger.warning("[%s] Remediation application failed", intent_id)
+    except Exception as e:
+        append_audit(intent_id, f"Remediation application error: {e}")
+        logger.exception("Error applying remediation for %s", intent_id)
+
+def _cadence(sla: Dict[str, Any]) -> float:
+    return TELEMETRY_CADENCE_SECONDS.get(str(sla.get("priority", "")).lower(), TELEMETRY_POLL_SECONDS)
+
+class _Schedule:
+    """Min-heap of (due_ts, intent_id) on the monotonic clock; stale entries are skipped lazily."""
+
+    def __init__(self):
+        self.heap: List[tuple] = []
+        self.due: Dict[str, float] = {}
+        self.cadence: Dict[str, float] = {}
+
+    def add(self, intent_id: str, cadence: float, due_ts: float):
+        self.cadence[intent_id] = cadence
+        self.push(intent_id, due_ts)
+
+    def push(self, intent_id: str, due_ts: float):
+        self.due[intent_id] = due_ts
+        heapq.heappush(self.heap, (due_ts, intent_id))
+
+    def remove(self, intent_id: str):
+        self.due.pop(intent_id, None)
+        self.cadence.pop(intent_id, None)
+
+    def _drop_stale(self):
+        while self.heap and self.due.get(self.heap[0][1]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+
+    def pop_due(self, now: float) -> List[str]:
+        ids = []
+        self._drop_stale()
+        while self.heap and self.heap[0][0] <= now + TELEMETRY_COALESCE_SECONDS:
+            _, intent_id = heapq.heappop(self.heap)
+            del self.due[intent_id]
+            ids.append(intent_id)
+            self._drop_stale()
+        return ids
+
+    def next_delay(self, now: float) -> Optional[float]:
+        self._drop_stale()
+        return max(0.0, self.heap[0][0] - now) if self.heap else None
+
+_schedule = _Schedule()
+_remediating: set = set()
+_remediation_tasks: set = set()
+
+def _post_event(kind: str, intent_id: str):
+    _events.put((kind, intent_id))
+    loop = _assurance_loop
+    if loop is not None:
+        loop.call_soon_threadsafe(_wakeup.set)
+
+def notify_intent_active(intent_id: str):
+    """Tell the assurance loop an intent was deployed so it is scheduled immediately."""
+    _post_event(_ACTIVE, intent_id)
+
+def notify_intent_inactive(intent_id: str):
+    """Tell the assurance loop to stop monitoring an intent."""
+    _post_event(_INACTIVE, intent_id)
+
+def _activate(intent_id: str, now: float):
+    if intent_id in intent_table:
+        return
+    row = get_intent_sla_selectors(intent_id)
+    if not row:
+        logger.debug("Intent %s disappeared from DB, skipping", intent_id)
+        return
+    _, sla = row
+    try:
+        intent_table.add(intent_id, sla)
+    except (TypeError, ValueError) as e:
+        logger.warning("[%s] Unusable SLA %r, skipping: %s", intent_id, sla, e)
+        return
+    _schedule.add(intent_id, _cadence(sla), now)
+
+def _drain_events(now: float):
     while True:
-        rows = _list_intents_from_db()
-        for row in rows:
-            try:
-                intent_id, status = row
-            except Exception:
-                continue
-
-            if status not in ("deployed", "assured"):
-                continue
-
-            metrics = _simulate_metrics_for_intent(intent_id)
-            telemetry_state[intent_id] = metrics
-
-            intent = get_intent(intent_id)
-            if not intent:
-                logger.debug("Intent %s disappeared from DB, skipping", intent_id)
-                continue
-
-            sla = intent.get("sla", {})
-            if _should_remediate(sla, metrics):
-                msg = f"SLA breach: latency={metrics['latency']:.1f}ms avail={metrics['availability']:.2f}% bw={metrics['bandwidth']:.1f}Mbps"
-                append_audit(intent_id, msg)
-                logger.info("[%s] %s", intent_id, msg)
-
-                payload = {
-                    "intent_id": intent_id,
-                    "selectors": intent.get("selectors", {}),
-                    "sla": sla,
-                    "last_metrics": metrics
-                }
-
-                try:
-                    new_policy = _call_llm_with_retries(payload, context=None)
-                except Exception as e:
-                    append_audit(intent_id, f"Remediation failed: LLM unavailable or error: {e}")
-                    logger.exception("LLM remediation failed for %s", intent_id)
-                    continue
-
-                try:
-                    attach_policy(intent_id, new_policy.dict())
-                    append_audit(intent_id, "LLM produced remediation policy and attached")
-                    logger.info("[%s] LLM remediation produced policy", intent_id)
-                except Exception as e:
-                    append_audit(intent_id, f"Remediation failed: cannot attach policy: {e}")
-                    logger.exception("Failed to attach policy for %s", intent_id)
-                    continue
-
-                try:
-                    res = apply_policy(new_policy.dict())
-                    if res.get("applied"):
-                        update_status(intent_id, "deployed")
-                        append_audit(intent_id, "Remediation applied successfully")
-                        logger.info("[%s] Remediation applied successfully", intent_id)
-                    else:
-                        append_audit(intent_id, "Remediation application failed")
-                        logger.warning("[%s] Remediation application failed", intent_id)
-                except Exception as e:
-                    append_audit(intent_id, f"Remediation application error: {e}")
-                    logger.exception("Error applying remediation for %s", intent_id)
-            else:
-                update_status(intent_id, "assured")
-        time.sleep(TELEMETRY_POLL_SECONDS)
-
-def start_background_loop():
-    t = threading.Thread(target=telemetry_loop, daemon=True)
-    t.start()
-    return t
+        try:
+            kind, intent_id = _events.get_nowait()
+        except queue.Empty:
+            return
+        if kind == _ACTIVE:
+            _activate(intent_id, now)
+        else:
+            intent_table.remove(intent_id)
+            _schedule.remove(intent_id)
+
+def _spawn_remediation(intent_id: str, selectors: Dict[str, Any], sla: Dict[str, Any], metrics: Dict[str, float]):
+    # runs concurrently with later ticks; at most one remediation per intent at a time
+    async def run():
+        try:
+            await _remediate_one(intent_id, selectors, sla, metrics)
+        except Exception as e:
+            logger.error("Remediation for %s raised: %s", intent_id, e)
+        finally:
+            _remediating.discard(intent_id)
+
+    _remediating.add(intent_id)
+    task = asyncio.get_running_loop().create_task(run())
+    _remediation_tasks.add(task)
+    task.add_done_callback(_remediation_tasks.discard)
+
+def _tick(due_ids: List[str]):
+    """Simulate and check the given intents in one kernel call, then start remediations for breaches."""
+    tbl = intent_table
+    with tbl.lock:
+        due_ids = [i for i in due_ids if i in tbl]
+        if not due_ids:
+            return
+        rows = np.fromiter((tbl.idx[i] for i in due_ids), dtype=np.intp, count=len(due_ids))
+        n = rows.shape[0]
+        out_lat = np.empty(n)
+        out_avail = np.empty(n)
+        out_bw = np.empty(n)
+        breach = np.empty(n, dtype=np.bool_)
+        _tick_kernel(tbl.sla_lat[rows], tbl.sla_avail[rows], tbl.sla_bw[rows], out_lat, out_avail, out_bw, breach)
+        tbl.m_lat[rows] = out_lat
+        tbl.m_avail[rows] = out_avail
+        tbl.m_bw[rows] = out_bw
+
+    for k, intent_id in enumerate(due_ids):
+        if not breach[k]:
+            update_status(intent_id, "assured")
+            continue
+        if intent_id in _remediating:
+            continue
+        row = get_intent_sla_selectors(intent_id)
+        if not row:
+            continue
+        selectors, sla = row
+        metrics = {"latency": float(out_lat[k]), "availability": float(out_avail[k]), "bandwidth": float(out_bw[k])}
+        msg = f"SLA breach: latency={metrics['latency']:.1f}ms avail={metrics['availability']:.2f}% bw={metrics['bandwidth']:.1f}Mbps"
+        append_audit(intent_id, msg)
+        logger.info("[%s] %s", intent_id, msg)
+        _spawn_remediation(intent_id, selectors, sla, metrics)
+
+async def _telemetry_main():
+    global _assurance_loop, _wakeup
+    logger.info("Assurance telemetry loop starting (cadence by priority %s, default %s seconds)", TELEMETRY_CADENCE_SECONDS, TELEMETRY_POLL_SECONDS)
+    _wakeup = asyncio.Event()
+    _assurance_loop = asyncio.get_running_loop()
+    # intents already deployed before this process started; later ones arrive as events
+    for intent_id in _list_intents_from_db():
+        _events.put((_ACTIVE, intent_id))
+
+    while True:
+        # cleared before draining so an event posted from here on still wakes the wait below
+        _wakeup.clear()
+        now = time.monotonic()
+        _drain_events(now)
+
+        due_ids = _schedule.pop_due(now)
+        if due_ids:
+            _tick(due_ids)
+            now = time.monotonic()
+            for intent_id in due_ids:
+                if intent_id in intent_table:
+                    _schedule.push(intent_id, now + _schedule.cadence[intent_id])
+            continue
+
+        try:
+            await asyncio.wait_for(_wakeup.wait(), _schedule.next_delay(now))
+        except asyncio.TimeoutError:
+            pass
+
+def telemetry_loop():
+    asyncio.run(_telemetry_main())
+
+_assurance_thread: Optional[threading.Thread] = None
+
+def start_background_loop(loop: Optional[asyncio.AbstractEventLoop] = None):
+    global _llm_loop, _assurance_thread
+    _llm_loop = loop
+    # one assurance loop per process: _wakeup and the schedule are module state, so a second
+    # startup (e.g. a reused TestClient) only re-points LLM calls at the new FastAPI loop
+    if _assurance_thread is None or not _assurance_thread.is_alive():
+        _assurance_thread = threading.Thread(target=telemetry_loop, daemon=True)
+        _assurance_thread.start()
+    return _assurance_thread
@@ -0,0 +1,127 @@
+import asyncio
+import functools
+import logging
+import threading
+import time
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger("ibn.circuit_breaker")
+logger.setLevel(logging.INFO)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    CLOSED -> OPEN after `failure_threshold` consecutive failures.
+    OPEN -> HALF_OPEN once `recovery_timeout` seconds have passed since the last failure.
+    HALF_OPEN lets up to `half_open_max_calls` trial calls through at a time; that many
+    successes close the breaker again, any failure re-opens it.
+    Admission (acquire/release) is per caller, outcomes (record_success/record_failure) are
+    per upstream call, so a batch of callers sharing one request counts once.
+    One instance is shared by the FastAPI workers and the assurance thread.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0, half_open_max_calls: int = 3):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._state = CLOSED
+        self.failure_count = 0
+        self.last_failure_ts = 0.0
+        self.success_count_half_open = 0
+        self._half_open_calls = 0
+        # bumped on every transition so a slot taken in an earlier HALF_OPEN is not released twice
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def _transition(self, new_state: str):
+        if new_state != self._state:
+            logger.warning("Circuit breaker %s: %s -> %s", self.name, self._state, new_state)
+            self._state = new_state
+            self._generation += 1
+            self.success_count_half_open = 0
+            self._half_open_calls = 0
+
+    def _maybe_half_open(self):
+        if self._state == OPEN and time.monotonic() - self.last_failure_ts >= self.recovery_timeout:
+            self._transition(HALF_OPEN)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def acquire(self) -> Optional[int]:
+        """
+        Return a ticket if a call may go through, None if the breaker rejects it.
+        Every ticket must be handed back with release(), whatever the call's outcome.
+        """
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == CLOSED:
+                return self._generation
+            if self._state == HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                return self._generation
+            return None
+
+    def release(self, ticket: int):
+        with self._lock:
+            if self._state == HALF_OPEN and ticket == self._generation and self._half_open_calls > 0:
+                self._half_open_calls -= 1
+
+    def record_success(self):
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self.success_count_half_open += 1
+                if self.success_count_half_open >= self.half_open_max_calls:
+                    self._transition(CLOSED)
+                    self.failure_count = 0
+            else:
+                self.failure_count = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failure_count += 1
+            self.last_failure_ts = time.monotonic()
+            if self._state == HALF_OPEN or self.failure_count >= self.failure_threshold:
+                self._transition(OPEN)
+
+    def guard(self, fallback: Callable[..., Any]):
+        """
+        Decorator: while the breaker rejects calls, return fallback(*args, **kwargs) instead of
+        calling the wrapped function. The admission slot is released however the call ends,
+        including cancellation. The wrapped function records the outcome of its upstream calls
+        itself with record_success()/record_failure(); its own exceptions are not counted.
+        """
+        def decorator(fn):
+            if asyncio.iscoroutinefunction(fn):
+                @functools.wraps(fn)
+                async def async_wrapper(*args, **kwargs):
+                    ticket = self.acquire()
+                    if ticket is None:
+                        logger.info("Circuit breaker %s open - using fallback for %s", self.name, fn.__name__)
+                        return fallback(*args, **kwargs)
+                    try:
+                        return await fn(*args, **kwargs)
+                    finally:
+                        self.release(ticket)
+                return async_wrapper
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                ticket = self.acquire()
+                if ticket is None:
+                    logger.info("Circuit breaker %s open - using fallback for %s", self.name, fn.__name__)
+                    return fallback(*args, **kwargs)
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.release(ticket)
+            return wrapper
+        return decorator
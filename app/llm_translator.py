@@ -1,12 +1,17 @@
 import os
-import json
 import re
+import json
+import asyncio
+import functools
+import threading
 import logging
 from typing import Dict, Any, List, Optional
 
+import orjson
 from pydantic import ValidationError
 
-from .schemas import Intent, Policy  
+from .schemas import Intent, Policy, model_to_dict  
+from .circuit_breaker import CircuitBreaker
 
 logger = logging.getLogger("ibn.llm_translator")
 logger.setLevel(logging.INFO)
@@ -18,6 +23,13 @@ except Exception:
     genai = None  
     GENAI_MODULE = False
 
+try:
+    import hyperscan  
+    HYPERSCAN_MODULE = True
+except Exception:
+    hyperscan = None  
+    HYPERSCAN_MODULE = False
+
 GENAI_API_KEY = os.getenv("GENAI_API_KEY") or os.getenv("GENAI_KEY") or None
 if GENAI_MODULE and GENAI_API_KEY:
     try:
@@ -25,23 +37,252 @@ if GENAI_MODULE and GENAI_API_KEY:
     except Exception as e:
         logger.warning("Failed to configure genai with API key: %s", e)
 
+def _dumps(obj, default=None) -> str:
+    try:
+        return orjson.dumps(obj, default=default).decode()
+    except orjson.JSONEncodeError:
+        # e.g. integers wider than 64 bits, which orjson rejects and stdlib json accepts
+        return json.dumps(obj, default=default)
+
+_loads = orjson.loads
+
+# micro-batching of concurrent Gemini calls
+BATCH_WINDOW_MS = 20
+BATCH_MAX_SIZE = 8
+MAX_OUTPUT_TOKENS = 512
+GENAI_TIMEOUT_SECONDS = 30.0  # a hung upstream call counts as a failure instead of holding its breaker slot
+BATCH_MARKER = "===INTENT {}==="
+# markers only count on a line of their own, so text quoted inside an answer cannot split it
+_BATCH_MARKER_RE = re.compile(r"^===INTENT (\d+)===[ \t]*$", re.MULTILINE)
+# any marker-looking line in a submitted prompt, which could shift the request boundaries
+_BATCH_MARKER_LINE_RE = re.compile(r"^[ \t]*=+[ \t]*INTENT\b.*$", re.MULTILINE | re.IGNORECASE)
+
+BATCH_PREAMBLE = """
+You will receive {k} independent requests. Each request starts with a marker line
+of the form ===INTENT n===. Answer every request, in order, and start each answer
+with the same marker line on its own, followed only by that answer.
+"""
+
+
+class _BatchQueue:
+    """
+    Coalesces prompts submitted within BATCH_WINDOW_MS into a single generate_text call.
+    The combined response is split back on the ===INTENT k=== markers and each caller
+    receives the raw text of its own answer.
+    Only prompts built from structured, JSON-encoded data are batched; free-form user text
+    is sent on its own (batch=False) so it never shares a prompt with another client's request.
+    """
+
+    def __init__(self, window_ms: int = BATCH_WINDOW_MS, max_size: int = BATCH_MAX_SIZE):
+        self.window = window_ms / 1000.0
+        self.max_size = max_size
+        # one queue and worker per event loop (FastAPI's, and the assurance thread's when it
+        # has no FastAPI loop to submit to); a worker only ever touches its own loop's queue
+        self._queues: Dict[asyncio.AbstractEventLoop, asyncio.Queue] = {}
+        self._lock = threading.Lock()
+        self._pending = set()
+
+    def _queue_for_running_loop(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            queue = self._queues.get(loop)
+            if queue is not None:
+                return queue
+            queue = self._queues[loop] = asyncio.Queue()
+        self._spawn(self._worker(queue))
+        return queue
+
+    def _spawn(self, coro):
+        task = asyncio.get_running_loop().create_task(coro)
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def submit(self, prompt: str, batch: bool = True) -> str:
+        if not batch:
+            return await self._generate(prompt, 1)
+        queue = self._queue_for_running_loop()
+        fut = asyncio.get_running_loop().create_future()
+        await queue.put((_BATCH_MARKER_LINE_RE.sub("", prompt), fut))
+        return await fut
+
+    async def _worker(self, queue: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                batch = [await queue.get()]
+                deadline = loop.time() + self.window
+                while len(batch) < self.max_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                self._spawn(self._dispatch(batch))
+        finally:
+            # the loop is shutting down; a later loop gets a fresh queue
+            with self._lock:
+                if self._queues.get(loop) is queue:
+                    del self._queues[loop]
+
+    async def _generate(self, prompt: str, k: int) -> str:
+        # the one place Gemini is called: one breaker outcome per upstream call, not per caller
+        try:
+            resp = await asyncio.wait_for(
+                asyncio.to_thread(
+                    genai.generate_text,
+                    model="gemini",
+                    prompt=prompt,
+                    max_output_tokens=MAX_OUTPUT_TOKENS * k,
+                    temperature=0.0,
+                ),
+                GENAI_TIMEOUT_SECONDS,
+            )
+        except BaseException:
+            # includes timeouts and cancellation
+            breaker.record_failure()
+            raise
+        breaker.record_success()
+        return resp.text
+
+    async def _dispatch(self, batch):
+        k = len(batch)
+        if k == 1:
+            prompt = batch[0][0]
+        else:
+            parts = [BATCH_PREAMBLE.format(k=k)]
+            for i, (p, _) in enumerate(batch, 1):
+                parts.append(BATCH_MARKER.format(i) + "\n" + p)
+            prompt = "\n\n".join(parts)
+
+        try:
+            raw = await self._generate(prompt, k)
+        except Exception as e:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+
+        if k == 1:
+            answers = {1: raw}
+        else:
+            # re.split with a capture group yields [preamble, "1", answer1, "2", answer2, ...]
+            pieces = _BATCH_MARKER_RE.split(raw)
+            answers = {int(n): chunk for n, chunk in zip(pieces[1::2], pieces[2::2])}
+
+        for i, (_, fut) in enumerate(batch, 1):
+            if fut.done():
+                continue
+            if i in answers:
+                fut.set_result(answers[i])
+            else:
+                fut.set_exception(ValueError(f"Batched model response has no answer for request {i}. Raw: {raw}"))
+
+
+_batcher = _BatchQueue()
+
+# shared by the API handlers and the assurance loop
+breaker = CircuitBreaker("gemini", failure_threshold=5, recovery_timeout=30.0, half_open_max_calls=3)
+
+_RE_BRACE = re.compile(r"[{}]")
+
 def _extract_first_json(text: str) -> str:
     start = text.find("{")
     if start == -1:
         raise ValueError("No JSON object found in model response")
-    stack = []
-    end = start
-    for i, ch in enumerate(text[start:], start):
-        if ch == "{":
-            stack.append("{")
-        elif ch == "}":
-            if not stack:
-                raise ValueError("Mismatched closing brace")
-            stack.pop()
-            if not stack:
-                end = i
-                break
-    return text[start:end + 1]
+    # the regex engine skips everything but braces in C; Python only sees one step per brace
+    depth = 0
+    for m in _RE_BRACE.finditer(text, start):
+        depth += 1 if m.group() == "{" else -1
+        if depth == 0:
+            return text[start:m.end()]
+    raise ValueError("Unterminated JSON object in model response")
+
+# deterministic NL fallback parser patterns, compiled once at import
+_RE_SRC = re.compile(r"src(?:ed|:)?\s*([0-9]+\.[0-9]+\.[0-9]+\.[0-9]+\/\d+)")
+_RE_DST = re.compile(r"dst(?:ination|:)?\s*([0-9]+\.[0-9]+\.[0-9]+\.[0-9]+\/\d+)")
+_RE_SRC2 = re.compile(r"from\s+\(?([0-9]+\.[0-9]+\.[0-9]+\.[0-9]+\/\d+)\)?")
+_RE_DST2 = re.compile(r"to\s+\(?([0-9]+\.[0-9]+\.[0-9]+\.[0-9]+\/\d+)\)?")
+_RE_PORT = re.compile(r"port[s]?\s*(?:is|=|:)?\s*([0-9]{1,5})")
+_RE_APP = re.compile(r"app(?:lication)?\s*(?:named)?\s*([A-Za-z0-9_\-]+)")
+_RE_LATENCY = re.compile(r"latency\s*(?:under|<|less than)?\s*([0-9]{1,4})\s*ms")
+_RE_BW = re.compile(r"([0-9]{2,4})\s*Mbps")
+_RE_PRIORITY = re.compile(r"\b(high|medium|low)\b", re.IGNORECASE)
+_RE_OWNER = re.compile(r"[\w\.-]+@[\w\.-]+\.\w+")
+
+_NL_FIELDS = {
+    "src": _RE_SRC,
+    "dst": _RE_DST,
+    "src2": _RE_SRC2,
+    "dst2": _RE_DST2,
+    "port": _RE_PORT,
+    "app": _RE_APP,
+    "latency": _RE_LATENCY,
+    "bw": _RE_BW,
+    "priority": _RE_PRIORITY,
+    "owner": _RE_OWNER,
+}
+
+def _nl_value(m) -> str:
+    # value is the field pattern's first capture group, or the whole match if it has none (owner)
+    return m.group(1) if m.re.groups else m.group(0)
+
+
+def _build_hyperscan_db():
+    db = hyperscan.Database()
+    kinds = list(_NL_FIELDS)
+    db.compile(
+        expressions=[_NL_FIELDS[k].pattern.encode() for k in kinds],
+        ids=list(range(len(kinds))),
+        elements=len(kinds),
+        flags=[
+            hyperscan.HS_FLAG_SOM_LEFTMOST | (hyperscan.HS_FLAG_CASELESS if _NL_FIELDS[k].flags & re.IGNORECASE else 0)
+            for k in kinds
+        ],
+    )
+    return db, kinds
+
+
+_HS_DB = None
+if HYPERSCAN_MODULE:
+    try:
+        _HS_DB = _build_hyperscan_db()
+    except Exception as e:
+        logger.warning("Failed to compile hyperscan database, using re fallback: %s", e)
+
+
+def _scan_nl_fields(text: str) -> Dict[str, str]:
+    """
+    Return {field kind: value} for the first occurrence of each NL field in text, with the same
+    per-field semantics as searching for each pattern on its own. Hyperscan, when installed,
+    finds every field's start in one pass over the text.
+    """
+    found: Dict[str, str] = {}
+    # hyperscan offsets are byte offsets, so only use it when they coincide with str indices
+    if _HS_DB is not None and text.isascii():
+        db, kinds = _HS_DB
+        starts: Dict[int, int] = {}
+
+        def on_match(pattern_id, start, end, flags, context):
+            if start < starts.get(pattern_id, len(text)):
+                starts[pattern_id] = start
+
+        db.scan(text.encode(), match_event_handler=on_match)
+        for pattern_id, start in starts.items():
+            kind = kinds[pattern_id]
+            m = _NL_FIELDS[kind].search(text, start)
+            if m:
+                found[kind] = _nl_value(m)
+        return found
+
+    # without hyperscan, one precompiled search() per field; a fused alternation cannot give
+    # every field its own leftmost match and measured slower than these C-level searches
+    for kind, p in _NL_FIELDS.items():
+        m = p.search(text)
+        if m:
+            found[kind] = _nl_value(m)
+    return found
 
 NL_PARSE_INSTRUCTIONS = """
 You are a strict JSON extractor for network intents.
@@ -86,74 +327,64 @@ Return JSON only.
 """
 
 
-def parse_intent_from_text(text: str, context: Optional[List[Dict[str,str]]] = None) -> Dict[str, Any]:
+def _deterministic_parse(text: str, context: Optional[List[Dict[str,str]]] = None) -> Dict[str, Any]:
+    name = "NL-Intent"
+    owner = "unknown@example.com"
+    selectors = {"src": "", "dst": "", "app": "", "ports": ""}
+    sla = {"latency_ms": 50, "availability_pct": 99.9, "min_bandwidth_mbps": 100, "priority": "medium"}
+    description = text
+
+    found = _scan_nl_fields(text)
+    if "src" in found or "src2" in found:
+        selectors["src"] = found.get("src", found.get("src2"))
+    if "dst" in found or "dst2" in found:
+        selectors["dst"] = found.get("dst", found.get("dst2"))
+    if "port" in found:
+        selectors["ports"] = found["port"]
+    if "app" in found:
+        selectors["app"] = found["app"]
+    if "latency" in found:
+        sla["latency_ms"] = int(found["latency"])
+    if "bw" in found:
+        sla["min_bandwidth_mbps"] = int(found["bw"])
+    if "priority" in found:
+        sla["priority"] = found["priority"].lower()
+    if "owner" in found:
+        owner = found["owner"]
+
+    candidate = {
+        "name": name,
+        "owner": owner,
+        "selectors": selectors,
+        "sla": sla,
+        "description": description
+    }
+    intent = Intent(**candidate)
+    return model_to_dict(intent)
+
+
+@breaker.guard(fallback=_deterministic_parse)
+async def parse_intent_from_text(text: str, context: Optional[List[Dict[str,str]]] = None) -> Dict[str, Any]:
 
     if not GENAI_MODULE or not (GENAI_API_KEY or os.getenv("GOOGLE_APPLICATION_CREDENTIALS")):
         logger.info("GENAI not configured - using deterministic NL fallback parser")
-        name = "NL-Intent"
-        owner = "unknown@example.com"
-        selectors = {"src": "", "dst": "", "app": "", "ports": ""}
-        sla = {"latency_ms": 50, "availability_pct": 99.9, "min_bandwidth_mbps": 100, "priority": "medium"}
-        description = text
-
-        m_src = re.search(r"src(?:ed|:)?\s*([0-9]+\.[0-9]+\.[0-9]+\.[0-9]+\/\d+)", text)
-        m_dst = re.search(r"dst(?:ination|:)?\s*([0-9]+\.[0-9]+\.[0-9]+\.[0-9]+\/\d+)", text)
-        m_src2 = re.search(r"from\s+\(?([0-9]+\.[0-9]+\.[0-9]+\.[0-9]+\/\d+)\)?", text)
-        m_dst2 = re.search(r"to\s+\(?([0-9]+\.[0-9]+\.[0-9]+\.[0-9]+\/\d+)\)?", text)
-        if m_src:
-            selectors["src"] = m_src.group(1)
-        elif m_src2:
-            selectors["src"] = m_src2.group(1)
-        if m_dst:
-            selectors["dst"] = m_dst.group(1)
-        elif m_dst2:
-            selectors["dst"] = m_dst2.group(1)
-
-        m_port = re.search(r"port[s]?\s*(?:is|=|:)?\s*([0-9]{1,5})", text)
-        if m_port:
-            selectors["ports"] = m_port.group(1)
-        m_app = re.search(r"app(?:lication)?\s*(?:named)?\s*([A-Za-z0-9_\-]+)", text)
-        if m_app:
-            selectors["app"] = m_app.group(1)
-
-        m_latency = re.search(r"latency\s*(?:under|<|less than)?\s*([0-9]{1,4})\s*ms", text)
-        if m_latency:
-            sla["latency_ms"] = int(m_latency.group(1))
-        m_bw = re.search(r"([0-9]{2,4})\s*Mbps", text)
-        if m_bw:
-            sla["min_bandwidth_mbps"] = int(m_bw.group(1))
-        m_priority = re.search(r"\b(high|medium|low)\b", text, re.IGNORECASE)
-        if m_priority:
-            sla["priority"] = m_priority.group(1).lower()
-        m_owner = re.search(r"[\w\.-]+@[\w\.-]+\.\w+", text)
-        if m_owner:
-            owner = m_owner.group(0)
-
-        candidate = {
-            "name": name,
-            "owner": owner,
-            "selectors": selectors,
-            "sla": sla,
-            "description": description
-        }
-        intent = Intent(**candidate)
-        return intent.dict()
+        return _deterministic_parse(text, context)
 
     logger.info("Calling Gemini to parse NL intent")
     prompt = NL_PARSE_INSTRUCTIONS + "\n\nInput:\n" + text
     if context:
-        prompt += "\n\nContext:\n" + json.dumps(context)
+        prompt += "\n\nContext:\n" + _dumps(context)
 
     try:
-        resp = genai.generate_text(model="gemini", prompt=prompt, max_output_tokens=512, temperature=0.0)
-        raw = resp.text
+        # free-form client text: never batched together with other clients' requests
+        raw = await _batcher.submit(prompt, batch=False)
     except Exception as e:
         logger.exception("GenAI call failed: %s", e)
         raise RuntimeError(f"GenAI call failed: {e}")
 
     try:
         js = _extract_first_json(raw)
-        parsed = json.loads(js)
+        parsed = _loads(js)
     except Exception as e:
         logger.exception("Failed to parse JSON from Gemini: %s -- raw: %s", e, raw)
         raise ValueError(f"Failed to parse JSON from model output: {e}. Raw output: {raw}")
@@ -164,41 +395,66 @@ def parse_intent_from_text(text: str, context: Optional[List[Dict[str,str]]] = N
         logger.exception("Parsed intent failed validation: %s", e)
         raise
 
-    return intent_obj.dict()
+    return model_to_dict(intent_obj)
+
+@functools.lru_cache(maxsize=4096)
+def _fallback_policy(intent_id: str, priority: str, min_bw: int, latency: int, avoid: Optional[str], ports: str) -> Policy:
+    # the returned Policy is shared between callers; they only ever read it via model_to_dict()
+    policy = {
+        "intent_id": intent_id,
+        "qos": {
+            "class_name": "premium" if priority == "high" else "standard",
+            "min_bandwidth_mbps": min_bw
+        },
+        "routing": {
+            "preferred_path": "low-latency" if latency <= 50 else "cost-optimized",
+            "avoid": avoid
+        },
+        "acl": {"allow": [ports]}
+    }
+    return Policy(**policy)
+
+def _deterministic_policy(intent: Dict[str, Any], context: Optional[List[Dict[str,str]]] = None) -> Policy:
+    args = (
+        intent["intent_id"],
+        str(intent["sla"].get("priority","")).lower(),
+        int(intent["sla"].get("min_bandwidth_mbps", 100)),
+        int(intent["sla"].get("latency_ms", 999)),
+        intent.get("constraints", {}).get("avoid_country"),
+        intent["selectors"].get("ports",""),
+    )
+    try:
+        return _fallback_policy(*args)
+    except TypeError:
+        # unhashable selector/constraint values (e.g. a list of ports) bypass the cache
+        return _fallback_policy.__wrapped__(*args)
+
+# the only intent fields a policy is derived from; free-form name/owner/description stay out of
+# the prompt, which may be batched with other clients' intents
+_TRANSLATION_FIELDS = ("intent_id", "selectors", "sla", "constraints", "last_metrics")
 
-def llm_translate_intent(intent: Dict[str, Any], context: Optional[List[Dict[str,str]]] = None) -> Policy:
+@breaker.guard(fallback=_deterministic_policy)
+async def llm_translate_intent(intent: Dict[str, Any], context: Optional[List[Dict[str,str]]] = None) -> Policy:
     if not GENAI_MODULE or not (GENAI_API_KEY or os.getenv("GOOGLE_APPLICATION_CREDENTIALS")):
         logger.info("GENAI not configured - using deterministic translator fallback")
-        policy = {
-            "intent_id": intent["intent_id"],
-            "qos": {
-                "class_name": "premium" if str(intent["sla"].get("priority","")).lower() == "high" else "standard",
-                "min_bandwidth_mbps": int(intent["sla"].get("min_bandwidth_mbps", 100))
-            },
-            "routing": {
-                "preferred_path": "low-latency" if int(intent["sla"].get("latency_ms", 999)) <= 50 else "cost-optimized",
-                "avoid": intent.get("constraints", {}).get("avoid_country")
-            },
-            "acl": {"allow": [intent["selectors"].get("ports","")]}
-        }
-        return Policy(**policy)
+        return _deterministic_policy(intent, context)
 
     logger.info("Calling Gemini to translate intent to policy")
-    prompt_parts = [POLICY_SCHEMA_PROMPT, "Intent:\n" + json.dumps(intent, default=str)]
+    payload = {k: intent[k] for k in _TRANSLATION_FIELDS if k in intent}
+    prompt_parts = [POLICY_SCHEMA_PROMPT, "Intent:\n" + _dumps(payload, default=str)]
     if context:
-        prompt_parts.append("Context:\n" + json.dumps(context, default=str))
+        prompt_parts.append("Context:\n" + _dumps(context, default=str))
     prompt = "\n\n".join(prompt_parts)
 
     try:
-        resp = genai.generate_text(model="gemini", prompt=prompt, max_output_tokens=512, temperature=0.0)
-        raw = resp.text
+        raw = await _batcher.submit(prompt)
     except Exception as e:
         logger.exception("GenAI translation failed: %s", e)
         raise RuntimeError(f"GenAI translation failed: {e}")
 
     try:
         js = _extract_first_json(raw)
-        parsed = json.loads(js)
+        parsed = _loads(js)
     except Exception as e:
         logger.exception("Failed to extract JSON from policy output: %s -- raw: %s", e, raw)
         raise ValueError(f"Failed to parse JSON from model output: {e}. Raw: {raw}")
@@ -209,4 +465,9 @@ def llm_translate_intent(intent: Dict[str, Any], context: Optional[List[Dict[str
         logger.exception("Policy validation failed: %s", e)
         raise
 
+    # batched answers are matched to callers by the marker the model printed; never hand out another intent's policy
+    if policy.intent_id != intent["intent_id"]:
+        logger.error("Model returned a policy for %r while translating %r", policy.intent_id, intent["intent_id"])
+        raise ValueError(f"Model returned a policy for intent {policy.intent_id!r}, expected {intent['intent_id']!r}")
+
     return policy
@@ -2,21 +2,23 @@
 FastAPI entrypoint for the IBN Gemini-First POC.
 
 Endpoints:
- - POST /intents         -> create intent 
- - POST /intent_nl       -> create intent from natural-language text
+ - POST /intents         -> create intent (202; policy is applied in the background)
+ - POST /intent_nl       -> create intent from natural-language text (202, same as above)
  - GET  /intents/{id}    -> fetch intent record + audit + attached policy
  - GET  /telemetry/{id}  -> get last simulated telemetry for intent 
 """
 from fastapi import FastAPI, HTTPException, status
 from pydantic import BaseModel
 from typing import Dict, Any
-import uuid
+import secrets
+import asyncio
 import logging
 
-from .store import save_intent, get_intent, update_status, attach_policy, append_audit
+from .store import save_intent, get_intent, update_status, attach_policy, append_audit, flush_audit
 from .llm_translator import llm_translate_intent, parse_intent_from_text
 from .executor import apply_policy
-from .assurance import start_background_loop, telemetry_state
+from .schemas import model_to_dict
+from .assurance import start_background_loop, intent_table, notify_intent_active, notify_intent_inactive
 
 logger = logging.getLogger("ibn.main")
 logger.setLevel(logging.INFO)
@@ -24,13 +26,67 @@ handler = logging.StreamHandler()
 handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
 logger.addHandler(handler)
 
+APPLY_DRAIN_SECONDS = 10.0  # shutdown waits this long for in-flight applies, then cancels them
+
 app = FastAPI(title="IBN Gemini POC", version="0.2")
 
 @app.on_event("startup")
-def startup_event():
-    start_background_loop()
+async def startup_event():
+    # the assurance thread submits its LLM calls onto this loop so they share the batcher
+    start_background_loop(asyncio.get_running_loop())
     logger.info("IBN POC started, assurance loop launched.")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    # finish in-flight applies so their intents don't stay "deploying"; the assurance loop
+    # only reloads deployed/assured intents on the next start
+    pending = set(_apply_tasks)
+    if pending:
+        _, pending = await asyncio.wait(pending, timeout=APPLY_DRAIN_SECONDS)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    await asyncio.to_thread(flush_audit)
+
+# strong refs to in-flight apply tasks; the event loop only keeps weak ones
+# store calls go through asyncio.to_thread: SQLite can block up to busy_timeout, which must not stall the loop
+_apply_tasks = set()
+
+def _record_apply(intent_id: str, status: str, msg: str):
+    append_audit(intent_id, msg)
+    if status == "deployed":
+        notify_intent_active(intent_id)
+    else:
+        notify_intent_inactive(intent_id)
+
+async def _finalize_apply(intent_id: str, policy_dict: Dict[str, Any], origin: str = ""):
+    # outcome recorded if the task is cancelled (e.g. at shutdown) before it writes one itself
+    status, msg = "error", f"Policy application cancelled{origin}"
+    try:
+        res = await apply_policy(policy_dict)
+        if res.get("applied"):
+            status, msg = "deployed", f"Policy applied successfully{origin}"
+        else:
+            status, msg = "error", f"Policy application failed{origin}"
+        await asyncio.to_thread(update_status, intent_id, status)
+    except asyncio.CancelledError:
+        # synchronous on purpose: a cancelled task cannot rely on awaiting anything else
+        update_status(intent_id, status)
+        _record_apply(intent_id, status, msg)
+        raise
+    except Exception as e:
+        await asyncio.to_thread(update_status, intent_id, "error")
+        append_audit(intent_id, f"Policy application exception: {e}")
+        notify_intent_inactive(intent_id)
+        logger.exception("Error applying policy for %s", intent_id)
+        return
+    _record_apply(intent_id, status, msg)
+
+def _schedule_apply(intent_id: str, policy_dict: Dict[str, Any], origin: str = ""):
+    task = asyncio.create_task(_finalize_apply(intent_id, policy_dict, origin))
+    _apply_tasks.add(task)
+    task.add_done_callback(_apply_tasks.discard)
+
 class CreateIntent(BaseModel):
     name: str
     owner: str
@@ -38,9 +94,9 @@ class CreateIntent(BaseModel):
     sla: Dict[str, Any]
     description: str = ""
 
-@app.post("/intents", status_code=status.HTTP_201_CREATED)
-def create_intent(payload: CreateIntent):
-    intent_id = str(uuid.uuid4())
+@app.post("/intents", status_code=status.HTTP_202_ACCEPTED)
+async def create_intent(payload: CreateIntent):
+    intent_id = secrets.token_urlsafe(12)
     intent = {
         "intent_id": intent_id,
         "name": payload.name,
@@ -51,103 +107,79 @@ def create_intent(payload: CreateIntent):
     }
 
     try:
-        save_intent(intent, status="submitted")
+        await asyncio.to_thread(save_intent, intent, status="submitted")
     except Exception as e:
         logger.exception("Failed to save intent")
         raise HTTPException(status_code=500, detail=f"failed to save intent: {e}")
 
     try:
-        policy = llm_translate_intent(intent)
+        policy = await llm_translate_intent(intent)
     except Exception as e:
         append_audit(intent_id, f"Translation failed: {e}")
-        update_status(intent_id, "error")
+        await asyncio.to_thread(update_status, intent_id, "error")
         logger.exception("LLM translation failed for %s", intent_id)
         raise HTTPException(status_code=500, detail="intent translation failed")
 
+    policy_dict = model_to_dict(policy)
     try:
-        attach_policy(intent_id, policy.dict())
-        update_status(intent_id, "deploying")
+        await asyncio.to_thread(attach_policy, intent_id, policy_dict)
+        await asyncio.to_thread(update_status, intent_id, "deploying")
     except Exception as e:
         append_audit(intent_id, f"Attach policy failed: {e}")
-        update_status(intent_id, "error")
+        await asyncio.to_thread(update_status, intent_id, "error")
         logger.exception("Failed to attach policy for %s", intent_id)
         raise HTTPException(status_code=500, detail="failed to attach policy")
 
-    try:
-        res = apply_policy(policy.dict())
-        if res.get("applied"):
-            update_status(intent_id, "deployed")
-            append_audit(intent_id, "Policy applied successfully")
-            return {"intent_id": intent_id, "status": "deployed"}
-        else:
-            update_status(intent_id, "error")
-            append_audit(intent_id, "Policy application failed")
-            raise HTTPException(status_code=500, detail="policy application failed")
-    except HTTPException:
-        raise
-    except Exception as e:
-        update_status(intent_id, "error")
-        append_audit(intent_id, f"Policy application exception: {e}")
-        logger.exception("Error applying policy for %s", intent_id)
-        raise HTTPException(status_code=500, detail="policy application error")
+    # clients poll GET /intents/{id} for the final deployed/error status
+    _schedule_apply(intent_id, policy_dict)
+    return {"intent_id": intent_id, "status": "deploying"}
 
 class NLIntent(BaseModel):
     text: str
 
-@app.post("/intent_nl", status_code=status.HTTP_201_CREATED)
-def create_intent_nl(payload: NLIntent):
+@app.post("/intent_nl", status_code=status.HTTP_202_ACCEPTED)
+async def create_intent_nl(payload: NLIntent):
     """
     Accept natural-language intent text, parse to structured intent via LLM, then run the same
-    pipeline: persist -> translate -> attach policy -> apply policy.
+    pipeline: persist -> translate -> attach policy -> apply policy (in the background).
     """
     try:
-        parsed = parse_intent_from_text(payload.text)
+        parsed = await parse_intent_from_text(payload.text)
     except Exception as e:
         logger.exception("Failed to parse NL intent")
         raise HTTPException(status_code=400, detail=f"failed to parse intent text: {e}")
 
-    intent_id = str(uuid.uuid4())
+    intent_id = secrets.token_urlsafe(12)
     parsed["intent_id"] = intent_id
 
     try:
-        save_intent(parsed, status="submitted")
+        await asyncio.to_thread(save_intent, parsed, status="submitted")
         append_audit(intent_id, "Intent created from natural language")
     except Exception as e:
         logger.exception("Failed to save parsed intent")
         raise HTTPException(status_code=500, detail=f"failed to save parsed intent: {e}")
 
     try:
-        policy = llm_translate_intent(parsed)
+        policy = await llm_translate_intent(parsed)
     except Exception as e:
         append_audit(intent_id, f"Translation failed: {e}")
-        update_status(intent_id, "error")
+        await asyncio.to_thread(update_status, intent_id, "error")
         logger.exception("LLM translation failed for %s", intent_id)
         raise HTTPException(status_code=500, detail="intent translation failed")
 
+    policy_dict = model_to_dict(policy)
     try:
-        attach_policy(intent_id, policy.dict())
-        update_status(intent_id, "deploying")
+        await asyncio.to_thread(attach_policy, intent_id, policy_dict)
+        await asyncio.to_thread(update_status, intent_id, "deploying")
     except Exception as e:
         append_audit(intent_id, f"Attach policy failed: {e}")
-        update_status(intent_id, "error")
+        await asyncio.to_thread(update_status, intent_id, "error")
         logger.exception("Failed to attach policy for %s", intent_id)
         raise HTTPException(status_code=500, detail="failed to attach policy")
 
-    try:
-        res = apply_policy(policy.dict())
-        if res.get("applied"):
-            update_status(intent_id, "deployed")
-            append_audit(intent_id, "Policy applied successfully (from NL)")
-            return {"intent_id": intent_id, "status": "deployed"}
-        else:
-            update_status(intent_id, "error")
-            append_audit(intent_id, "Policy application failed (from NL)")
-            raise HTTPException(status_code=500, detail="policy application failed")
-    except Exception as e:
-        update_status(intent_id, "error")
-        append_audit(intent_id, f"Policy application exception: {e}")
-        logger.exception("Error applying policy for %s", intent_id)
-        raise HTTPException(status_code=500, detail="policy application error")
+    # clients poll GET /intents/{id} for the final deployed/error status
+    _schedule_apply(intent_id, policy_dict, origin=" (from NL)")
+    return {"intent_id": intent_id, "status": "deploying"}
 
 @app.get("/intents/{intent_id}")
 def get_intent_endpoint(intent_id: str):
@@ -158,7 +190,7 @@ def get_intent_endpoint(intent_id: str):
 
 @app.get("/telemetry/{intent_id}")
 def get_telemetry(intent_id: str):
-    return telemetry_state.get(intent_id, {})
+    return intent_table.metrics(intent_id)
 
 @app.get("/healthz")
 def health():
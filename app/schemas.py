@@ -34,3 +34,7 @@ class Policy(BaseModel):
     qos: QosPolicy
     routing: RoutingHint
     acl: Dict[str, Any]
+
+def model_to_dict(model: BaseModel) -> Dict[str, Any]:
+    # pydantic v2 deprecates .dict() in favour of .model_dump()
+    return model.model_dump() if hasattr(model, "model_dump") else model.dict()
\ No newline at end of file
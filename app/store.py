@@ -1,14 +1,65 @@
 import sqlite3
-from typing import Dict, Any
-from threading import Lock
 import json
+from typing import Dict, Any, Optional, Tuple
+import threading
+import queue
+import time
+import atexit
+import logging
+import orjson
 
-_db_lock = Lock()
-conn = sqlite3.connect('intents.db', check_same_thread=False)
-cur = conn.cursor()
-cur.execute("""
+logger = logging.getLogger("ibn.store")
+logger.setLevel(logging.INFO)
+
+
+def _dumps(obj) -> str:
+    try:
+        return orjson.dumps(obj).decode()
+    except orjson.JSONEncodeError:
+        # e.g. integers wider than 64 bits, which orjson rejects and stdlib json accepts
+        return json.dumps(obj)
+
+
+_loads = orjson.loads
+
+DB_PATH = 'intents.db'
+
+# audit messages are queued and written by one flusher thread, one transaction per batch
+AUDIT_FLUSH_MS = 100
+AUDIT_FLUSH_N = 256
+# a batch that hits lock contention (database locked past busy_timeout) is retried, not dropped
+AUDIT_RETRY_BASE = 0.1
+AUDIT_RETRY_CAP = 5.0
+AUDIT_DRAIN_ATTEMPTS = 3  # draining at exit must not wait on a lock forever
+
+# statement strings are reused verbatim so each connection's statement cache keeps them prepared
+_SQL_INSERT_INTENT = "INSERT INTO intents VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+_SQL_UPDATE_STATUS = "UPDATE intents SET status=? WHERE intent_id=?"
+_SQL_ATTACH_POLICY = "UPDATE intents SET policy=? WHERE intent_id=?"
+_SQL_APPEND_AUDIT = "UPDATE intents SET audit_log = json_insert(COALESCE(audit_log,'[]'), '$[#]', ?) WHERE intent_id=?"
+_SQL_SELECT_AUDIT = "SELECT audit_log FROM intents WHERE intent_id=?"
+_SQL_UPDATE_AUDIT = "UPDATE intents SET audit_log=? WHERE intent_id=?"
+_SQL_SELECT_INTENT = "SELECT * FROM intents WHERE intent_id=?"
+_SQL_SELECT_SLA_SELECTORS = "SELECT selectors, sla FROM intents WHERE intent_id=?"
+
+# one connection per thread (API workers, assurance loop); WAL lets readers run alongside the writer
+_tls = threading.local()
+
+
+def get_conn() -> sqlite3.Connection:
+    conn = getattr(_tls, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH, isolation_level=None, cached_statements=256)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA busy_timeout=5000')
+        _tls.conn = conn
+    return conn
+
+
+get_conn().execute("""
 CREATE TABLE IF NOT EXISTS intents (
-    intent_id TEXT PRIMARY KEY,
+    intent_id TEXT PRIMARY KEY,  -- secrets.token_urlsafe(12): 16 chars, 96 random bits
     name TEXT,
     owner TEXT,
     selectors TEXT,
@@ -19,62 +70,201 @@ CREATE TABLE IF NOT EXISTS intents (
     audit_log TEXT
 )
 """)
-conn.commit()
+get_conn().execute("CREATE INDEX IF NOT EXISTS idx_status ON intents(status)")
+
+# json1 (json_insert with '$[#]') is built in from SQLite 3.38
+_HAS_JSON1 = sqlite3.sqlite_version_info >= (3, 38)
 
 
 def save_intent(intent: Dict[str, Any], status: str = 'submitted'):
-    with _db_lock:
-        cur.execute(
-            "INSERT INTO intents VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
-            (
-                intent['intent_id'],
-                intent['name'],
-                intent['owner'],
-                json.dumps(intent['selectors']),
-                json.dumps(intent['sla']),
-                intent.get('description',''),
-                status,
-                None,
-                json.dumps([]),
-            ),
-        )
-        conn.commit()
+    get_conn().execute(
+        _SQL_INSERT_INTENT,
+        (
+            intent['intent_id'],
+            intent['name'],
+            intent['owner'],
+            _dumps(intent['selectors']),
+            _dumps(intent['sla']),
+            intent.get('description',''),
+            status,
+            None,
+            _dumps([]),
+        ),
+    )
 
 
 def update_status(intent_id: str, status: str):
-    with _db_lock:
-        cur.execute("UPDATE intents SET status=? WHERE intent_id=?", (status, intent_id))
-        conn.commit()
+    get_conn().execute(_SQL_UPDATE_STATUS, (status, intent_id))
 
 
 def attach_policy(intent_id: str, policy: Dict[str, Any]):
-    with _db_lock:
-        cur.execute("UPDATE intents SET policy=? WHERE intent_id=?", (json.dumps(policy), intent_id))
-        conn.commit()
+    get_conn().execute(_SQL_ATTACH_POLICY, (_dumps(policy), intent_id))
+
+
+# items are (intent_id, msg), a threading.Event to set once everything before it is written,
+# or None to stop the flusher
+_audit_q: "queue.SimpleQueue" = queue.SimpleQueue()
 
 
 def append_audit(intent_id: str, msg: str):
-    with _db_lock:
-        cur.execute("SELECT audit_log FROM intents WHERE intent_id=?", (intent_id,))
-        row = cur.fetchone()
-        if not row:
+    """Queue msg for intent_id's audit_log; it is persisted within AUDIT_FLUSH_MS."""
+    _audit_q.put_nowait((intent_id, msg))
+
+
+def _write_audits(batch):
+    conn = get_conn()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        if _HAS_JSON1:
+            conn.executemany(_SQL_APPEND_AUDIT, [(msg, intent_id) for intent_id, msg in batch])
+        else:
+            logs: Dict[str, list] = {}
+            for intent_id, msg in batch:
+                if intent_id not in logs:
+                    row = conn.execute(_SQL_SELECT_AUDIT, (intent_id,)).fetchone()
+                    if not row:
+                        continue
+                    logs[intent_id] = _loads(row[0] or "[]")
+                logs[intent_id].append(msg)
+            conn.executemany(_SQL_UPDATE_AUDIT, [(_dumps(log), intent_id) for intent_id, log in logs.items()])
+        conn.execute("COMMIT")
+    except BaseException:
+        # SQLite may already have rolled the transaction back itself
+        if conn.in_transaction:
+            try:
+                conn.execute("ROLLBACK")
+            except Exception:
+                logger.exception("Failed to roll back audit batch")
+        raise
+
+
+def _is_transient(e: Exception) -> bool:
+    return isinstance(e, sqlite3.OperationalError) and ("locked" in str(e) or "busy" in str(e))
+
+
+def _write_audits_retrying(batch, max_attempts: Optional[int] = None):
+    """
+    Write batch in order. Lock contention is retried with capped backoff (max_attempts times,
+    or until it succeeds); any other error is narrowed down by splitting the batch, so only
+    the offending message is dropped.
+    """
+    delay = AUDIT_RETRY_BASE
+    attempt = 0
+    while True:
+        try:
+            _write_audits(batch)
             return
-        log = json.loads(row[0] or "[]")
-        log.append(msg)
-        cur.execute("UPDATE intents SET audit_log=? WHERE intent_id=?", (json.dumps(log), intent_id))
-        conn.commit()
+        except Exception as e:
+            if _is_transient(e):
+                attempt += 1
+                if max_attempts is not None and attempt >= max_attempts:
+                    logger.error("Giving up on %d audit messages after %d attempts: %s", len(batch), attempt, e)
+                    return
+                logger.warning("Audit write failed (%s), retrying in %.1fs", e, delay)
+                time.sleep(delay)
+                delay = min(delay * 2, AUDIT_RETRY_CAP)
+                continue
+            if len(batch) == 1:
+                logger.exception("Dropping unwritable audit message for %s: %r", batch[0][0], batch[0][1])
+                return
+            mid = len(batch) // 2
+            _write_audits_retrying(batch[:mid], max_attempts)
+            _write_audits_retrying(batch[mid:], max_attempts)
+            return
+
+
+def _collect_batch():
+    """Block for the next batch: (messages, flush events to set after writing, stop flag)."""
+    batch, waiters = [], []
+    item = _audit_q.get()
+    deadline = time.monotonic() + AUDIT_FLUSH_MS / 1000.0
+    while True:
+        if item is None:
+            return batch, waiters, True
+        if isinstance(item, threading.Event):
+            # write now rather than waiting out the window; flush_audit() is blocked on it
+            waiters.append(item)
+            return batch, waiters, False
+        batch.append(item)
+        timeout = deadline - time.monotonic()
+        if len(batch) >= AUDIT_FLUSH_N or timeout <= 0:
+            return batch, waiters, False
+        try:
+            item = _audit_q.get(timeout=timeout)
+        except queue.Empty:
+            return batch, waiters, False
+
+
+def _audit_flusher():
+    # nothing may escape this loop: a dead flusher would leave every later message queued forever
+    while True:
+        try:
+            batch, waiters, stop = _collect_batch()
+            if batch:
+                _write_audits_retrying(batch)
+            for done in waiters:
+                done.set()
+            if stop:
+                return
+        except Exception:
+            logger.exception("Audit flusher error")
+
+
+def _drain_here():
+    # write whatever is queued on the calling thread, for when the flusher is not running
+    batch = []
+    while True:
+        try:
+            item = _audit_q.get_nowait()
+        except queue.Empty:
+            break
+        if isinstance(item, threading.Event):
+            item.set()
+        elif item is not None:
+            batch.append(item)
+    if batch:
+        _write_audits_retrying(batch, max_attempts=AUDIT_DRAIN_ATTEMPTS)
+
+
+def flush_audit(timeout: float = 5.0) -> bool:
+    """Wait until every message queued before the call is written. The flusher keeps running."""
+    if not _audit_thread.is_alive():
+        _drain_here()
+        return True
+    done = threading.Event()
+    _audit_q.put(done)
+    return done.wait(timeout)
+
+
+def _stop_audit_flusher():
+    # atexit: write what is still queued, then stop the flusher
+    if _audit_thread.is_alive():
+        _audit_q.put(None)
+        _audit_thread.join(timeout=5)
+    _drain_here()
 
 
 def get_intent(intent_id: str):
-    with _db_lock:
-        cur.execute("SELECT * FROM intents WHERE intent_id=?", (intent_id,))
-        row = cur.fetchone()
-        if not row:
-            return None
-        keys = ['intent_id','name','owner','selectors','sla','description','status','policy','audit_log']
-        r = dict(zip(keys, row))
-        r['selectors'] = json.loads(r['selectors'])
-        r['sla'] = json.loads(r['sla'])
-        r['policy'] = json.loads(r['policy']) if r['policy'] else None
-        r['audit_log'] = json.loads(r['audit_log'] or '[]')
-        return r
\ No newline at end of file
+    row = get_conn().execute(_SQL_SELECT_INTENT, (intent_id,)).fetchone()
+    if not row:
+        return None
+    keys = ['intent_id','name','owner','selectors','sla','description','status','policy','audit_log']
+    r = dict(zip(keys, row))
+    r['selectors'] = _loads(r['selectors'])
+    r['sla'] = _loads(r['sla'])
+    r['policy'] = _loads(r['policy']) if r['policy'] else None
+    r['audit_log'] = _loads(r['audit_log'] or '[]')
+    return r
+
+
+def get_intent_sla_selectors(intent_id: str) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """Return (selectors, sla) only; the assurance loop needs nothing else from the row."""
+    row = get_conn().execute(_SQL_SELECT_SLA_SELECTORS, (intent_id,)).fetchone()
+    if not row:
+        return None
+    return _loads(row[0]), _loads(row[1])
+
+
+_audit_thread = threading.Thread(target=_audit_flusher, name="audit-flusher", daemon=True)
+_audit_thread.start()
+atexit.register(_stop_audit_flusher)
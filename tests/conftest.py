@@ -0,0 +1,5 @@
+import os
+import tempfile
+
+# app.store opens intents.db in the working directory on import; keep it out of the checkout
+os.chdir(tempfile.mkdtemp(prefix="ibn-tests-"))
@@ -0,0 +1,130 @@
+import asyncio
+import time
+import types
+
+import pytest
+
+from app import llm_translator
+from app.circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+
+
+def _open_breaker(**kwargs):
+    cb = CircuitBreaker("test", failure_threshold=2, recovery_timeout=0.0, half_open_max_calls=2, **kwargs)
+    cb.record_failure()
+    cb.record_failure()
+    return cb
+
+
+def test_opens_after_threshold_consecutive_failures():
+    cb = CircuitBreaker("test", failure_threshold=3, recovery_timeout=60.0)
+    cb.record_failure()
+    cb.record_failure()
+    cb.record_success()
+    cb.record_failure()
+    cb.record_failure()
+    assert cb.state == CLOSED
+    cb.record_failure()
+    assert cb.state == OPEN
+    assert cb.acquire() is None
+
+
+def test_half_open_limits_trials_and_closes_after_successes():
+    cb = _open_breaker()
+    assert cb.state == HALF_OPEN
+    t1, t2 = cb.acquire(), cb.acquire()
+    assert t1 is not None and t2 is not None
+    assert cb.acquire() is None
+    cb.record_success()
+    cb.release(t1)
+    assert cb.state == HALF_OPEN
+    cb.record_success()
+    cb.release(t2)
+    assert cb.state == CLOSED
+
+
+def test_half_open_failure_reopens():
+    cb = CircuitBreaker("test", failure_threshold=1, recovery_timeout=0.0)
+    cb.record_failure()
+    ticket = cb.acquire()
+    assert ticket is not None
+    cb.record_failure()
+    cb.release(ticket)
+    assert cb._state == OPEN
+
+
+def test_release_from_earlier_half_open_does_not_free_a_new_slot():
+    cb = _open_breaker()
+    stale = cb.acquire()
+    cb.record_failure()  # HALF_OPEN -> OPEN -> HALF_OPEN (recovery_timeout=0)
+    assert cb.state == HALF_OPEN
+    t1, t2 = cb.acquire(), cb.acquire()
+    cb.release(stale)
+    assert cb.acquire() is None
+    cb.release(t1)
+    cb.release(t2)
+
+
+def test_cancelled_trial_releases_its_slot():
+    cb = _open_breaker()
+
+    @cb.guard(fallback=lambda: "fallback")
+    async def call():
+        await asyncio.sleep(10)
+
+    async def main():
+        for _ in range(3):
+            tasks = [asyncio.ensure_future(call()) for _ in range(2)]
+            await asyncio.sleep(0)
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run(main())
+    assert cb.state == HALF_OPEN
+    assert cb.acquire() is not None
+
+
+def test_guard_uses_fallback_while_open_and_does_not_count_own_errors():
+    cb = CircuitBreaker("test", failure_threshold=1, recovery_timeout=60.0)
+
+    @cb.guard(fallback=lambda x: "fallback")
+    def call(x):
+        return int(x)
+
+    with pytest.raises(TypeError):
+        call(None)
+    assert cb.state == CLOSED
+    cb.record_failure()
+    assert call("1") == "fallback"
+
+
+def test_failed_batched_call_counts_once(monkeypatch):
+    def generate_text(**kwargs):
+        raise RuntimeError("upstream down")
+
+    cb = CircuitBreaker("gemini", failure_threshold=2, recovery_timeout=60.0)
+    monkeypatch.setattr(llm_translator, "genai", types.SimpleNamespace(generate_text=generate_text))
+    monkeypatch.setattr(llm_translator, "breaker", cb)
+    batcher = llm_translator._BatchQueue(window_ms=50)
+
+    async def main():
+        return await asyncio.gather(*[batcher.submit("{}") for _ in range(5)], return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert cb.failure_count == 1
+    assert cb.state == CLOSED
+
+
+def test_upstream_timeout_counts_as_failure(monkeypatch):
+    def generate_text(**kwargs):
+        time.sleep(0.2)
+
+    cb = CircuitBreaker("gemini", failure_threshold=1, recovery_timeout=60.0)
+    monkeypatch.setattr(llm_translator, "genai", types.SimpleNamespace(generate_text=generate_text))
+    monkeypatch.setattr(llm_translator, "breaker", cb)
+    monkeypatch.setattr(llm_translator, "GENAI_TIMEOUT_SECONDS", 0.05)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(llm_translator._BatchQueue().submit("{}", batch=False))
+    assert cb.state == OPEN
@@ -0,0 +1,71 @@
+import random
+import re
+
+import pytest
+
+from app import llm_translator
+
+# the per-field searches the fallback parser ran before the patterns were fused
+BASELINE_PATTERNS = {
+    "src": (r"src(?:ed|:)?\s*([0-9]+\.[0-9]+\.[0-9]+\.[0-9]+\/\d+)", 0),
+    "dst": (r"dst(?:ination|:)?\s*([0-9]+\.[0-9]+\.[0-9]+\.[0-9]+\/\d+)", 0),
+    "src2": (r"from\s+\(?([0-9]+\.[0-9]+\.[0-9]+\.[0-9]+\/\d+)\)?", 0),
+    "dst2": (r"to\s+\(?([0-9]+\.[0-9]+\.[0-9]+\.[0-9]+\/\d+)\)?", 0),
+    "port": (r"port[s]?\s*(?:is|=|:)?\s*([0-9]{1,5})", 0),
+    "app": (r"app(?:lication)?\s*(?:named)?\s*([A-Za-z0-9_\-]+)", 0),
+    "latency": (r"latency\s*(?:under|<|less than)?\s*([0-9]{1,4})\s*ms", 0),
+    "bw": (r"([0-9]{2,4})\s*Mbps", 0),
+    "priority": (r"\b(high|medium|low)\b", re.IGNORECASE),
+    "owner": (r"[\w\.-]+@[\w\.-]+\.\w+", 0),
+}
+
+
+def baseline_scan(text):
+    found = {}
+    for kind, (pattern, flags) in BASELINE_PATTERNS.items():
+        m = re.search(pattern, text, flags)
+        if m:
+            found[kind] = m.group(1) if m.re.groups else m.group(0)
+    return found
+
+
+SENTENCES = [
+    "Video app from 10.0.0.0/24 to 10.1.0.0/24 latency under 30 ms, 200 Mbps, priority high",
+    "Video app from 10.0.0.0/24 — to 10.1.0.0/24 latency under 30 ms",
+    "application named high-throughput from 10.0.0.0/24 port 443 owner ops@example.com",
+    "app high",
+    "apps@corp.com wants src 192.168.1.0/24 dst 172.16.0.0/16 ports: 8080, LOW priority",
+    "Give the app to 10.2.0.0/16 at 500 Mbps with latency < 20 ms; contact net-team@example.org",
+    "srced10.0.0.0/8 destination 10.9.0.0/16 medium",
+    "",
+]
+
+TOKENS = [
+    "app", "application", "named", "from", "to", "src", "dst", "port", "ports", "latency",
+    "under", "ms", "Mbps", "high", "Medium", "low", "10.0.0.0/24", "(10.1.0.0/16)", "200",
+    "443", "ops@example.com", "—", "é", ":", "=", "is", "less than", "<",
+]
+
+
+def _sentences():
+    rng = random.Random(1234)
+    fuzz = [" ".join(rng.choice(TOKENS) for _ in range(rng.randint(1, 14))) for _ in range(500)]
+    return SENTENCES + fuzz
+
+
+@pytest.mark.parametrize("use_hyperscan", [False, True])
+def test_scan_matches_per_field_search(monkeypatch, use_hyperscan):
+    if use_hyperscan and llm_translator._HS_DB is None:
+        pytest.skip("hyperscan not installed")
+    if not use_hyperscan:
+        monkeypatch.setattr(llm_translator, "_HS_DB", None)
+    for text in _sentences():
+        assert llm_translator._scan_nl_fields(text) == baseline_scan(text), text
+
+
+def test_deterministic_parse_keeps_src_next_to_app():
+    parsed = llm_translator._deterministic_parse(SENTENCES[0])
+    assert parsed["selectors"]["src"] == "10.0.0.0/24"
+    assert parsed["selectors"]["dst"] == "10.1.0.0/24"
+    assert parsed["selectors"]["app"] == "from"
+    assert parsed["sla"]["priority"] == "high"
@@ -0,0 +1,48 @@
+from app.assurance import _Schedule, TELEMETRY_COALESCE_SECONDS
+
+
+def test_pops_due_intents_in_order_and_coalesces_near_ones():
+    s = _Schedule()
+    s.add("late", 5.0, 10.0)
+    s.add("b", 1.0, 2.0)
+    s.add("a", 1.0, 1.0)
+    s.add("near", 1.0, 2.0 + TELEMETRY_COALESCE_SECONDS / 2)
+    assert s.pop_due(0.5) == []
+    assert s.pop_due(2.0) == ["a", "b", "near"]
+    assert s.next_delay(2.0) == 8.0
+    assert s.pop_due(10.0) == ["late"]
+    assert s.next_delay(10.0) is None
+
+
+def test_rescheduling_leaves_the_old_entry_stale():
+    s = _Schedule()
+    s.add("a", 1.0, 1.0)
+    s.push("a", 10.0)
+    assert s.pop_due(5.0) == []
+    assert s.next_delay(5.0) == 5.0
+    assert s.pop_due(10.0) == ["a"]
+    assert s.heap == []
+
+
+def test_removed_intent_is_never_popped():
+    s = _Schedule()
+    s.add("a", 1.0, 1.0)
+    s.add("b", 1.0, 2.0)
+    s.remove("a")
+    assert s.pop_due(3.0) == ["b"]
+    assert "a" not in s.cadence
+
+
+def test_readd_after_remove_pops_once():
+    s = _Schedule()
+    s.add("a", 1.0, 1.0)
+    s.remove("a")
+    s.add("a", 2.0, 1.0)  # same due_ts as the stale entry still in the heap
+    assert s.pop_due(1.0) == ["a"]
+    assert s.pop_due(100.0) == []
+    assert s.cadence["a"] == 2.0
+
+    s.remove("a")
+    s.add("a", 1.0, 20.0)
+    assert s.pop_due(10.0) == []
+    assert s.pop_due(20.0) == ["a"]
@@ -0,0 +1,98 @@
+import secrets
+import sqlite3
+import threading
+import time
+
+from app import store
+
+
+def _new_intent():
+    intent_id = secrets.token_urlsafe(12)
+    store.save_intent({
+        "intent_id": intent_id,
+        "name": "n",
+        "owner": "o",
+        "selectors": {},
+        "sla": {},
+    })
+    return intent_id
+
+
+def test_unwritable_message_does_not_block_the_rest():
+    intent_id = _new_intent()
+    store.append_audit(intent_id, "first")
+    store.append_audit(intent_id, "bad \ud800")
+    store.append_audit(intent_id, "good")
+    assert store.flush_audit(timeout=5)
+    assert store.get_intent(intent_id)["audit_log"] == ["first", "good"]
+    assert store._audit_thread.is_alive()
+
+
+def test_locked_database_is_retried_not_dropped(monkeypatch):
+    monkeypatch.setattr(store, "AUDIT_RETRY_BASE", 0.01)
+    intent_id = _new_intent()
+    attempts = []
+    write_once = store._write_audits
+
+    def counting_write(batch):
+        attempts.append(len(batch))
+        write_once(batch)
+
+    monkeypatch.setattr(store, "_write_audits", counting_write)
+
+    def write():
+        # fail fast on the lock so the retry path, not SQLite's busy handler, does the waiting
+        store.get_conn().execute("PRAGMA busy_timeout=10")
+        store._write_audits_retrying([(intent_id, "a"), (intent_id, "b")])
+
+    blocker = sqlite3.connect(store.DB_PATH, isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+    try:
+        writer = threading.Thread(target=write)
+        writer.start()
+        time.sleep(0.2)
+        assert writer.is_alive()
+        blocker.execute("COMMIT")
+        writer.join(timeout=5)
+    finally:
+        if blocker.in_transaction:
+            blocker.execute("ROLLBACK")
+        blocker.close()
+    assert len(attempts) > 1 and set(attempts) == {2}
+    assert store.get_intent(intent_id)["audit_log"] == ["a", "b"]
+
+
+def test_flusher_batches_up_to_flush_n_and_keeps_order(monkeypatch):
+    assert store.flush_audit(timeout=5)
+    monkeypatch.setattr(store, "AUDIT_FLUSH_N", 4)
+    batches = []
+    write_once = store._write_audits
+
+    def recording_write(batch):
+        batches.append(list(batch))
+        write_once(batch)
+
+    monkeypatch.setattr(store, "_write_audits", recording_write)
+    a, b = _new_intent(), _new_intent()
+    expected = {a: [], b: []}
+    for i in range(10):
+        intent_id = a if i % 3 else b
+        store.append_audit(intent_id, f"m{i}")
+        expected[intent_id].append(f"m{i}")
+    assert store.flush_audit(timeout=5)
+
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+    assert [msg for batch in batches for _, msg in batch] == [f"m{i}" for i in range(10)]
+    assert store.get_intent(a)["audit_log"] == expected[a]
+    assert store.get_intent(b)["audit_log"] == expected[b]
+
+
+def test_flush_audit_returns_once_earlier_messages_are_written():
+    intent_id = _new_intent()
+    store.append_audit(intent_id, "before")
+    assert store.flush_audit(timeout=5)
+    assert store.get_intent(intent_id)["audit_log"] == ["before"]
+    # the flusher keeps running after a flush, e.g. for a second app lifespan
+    store.append_audit(intent_id, "after")
+    assert store.flush_audit(timeout=5)
+    assert store.get_intent(intent_id)["audit_log"] == ["before", "after"]